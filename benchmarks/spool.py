@@ -0,0 +1,57 @@
+"""Compare the write throughput of the spool against a line-buffered stdout.
+
+Usage::
+
+    uv run python benchmarks/spool.py [--count 200000]
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from collections.abc import Callable
+
+import structlog
+
+from structlog_gcp import spool
+
+ENTRY = (
+    '{"message": "benchmark entry", "time": "2023-04-01T08:00:00.000000Z", '
+    '"severity": "INFO", "logging.googleapis.com/sourceLocation": '
+    '{"file": "/app/main.py", "line": "42", "function": "main:handler"}, '
+    '"request_id": "0123456789abcdef"}'
+)
+
+
+def run(name: str, write: Callable[[str], None], count: int) -> None:
+    start = time.perf_counter()
+    for _ in range(count):
+        write(ENTRY)
+    elapsed = time.perf_counter() - start
+
+    print(f"{name:<32} {count / elapsed:>12,.0f} entries/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--count", type=int, default=200_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        # What structlog does by default, to a regular file instead of a
+        # terminal or a pipe.
+        path = os.path.join(directory, "stdout.log")
+        with open(path, "w", buffering=1) as fp:
+            run("stdout (line-buffered)", structlog.PrintLogger(fp).msg, args.count)
+
+        for compress in (False, True):
+            for fsync in ("never", "batch", "interval"):
+                spool_dir = os.path.join(directory, f"spool-{compress}-{fsync}")
+                writer = spool.SpoolWriter(spool_dir, compress=compress, fsync=fsync)
+                with writer:
+                    name = f"spool ({'zlib' if compress else 'raw'}, fsync={fsync})"
+                    run(name, writer.write, args.count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Measure the logging throughput of `build_processors()` from 1 to N threads.
+
+Usage::
+
+    uv run python benchmarks/threads.py [--threads 32] [--count 20000]
+
+Run it with a regular and a free-threaded (e.g. ``python3.13t``) interpreter to
+compare both builds.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable
+from typing import Any
+
+import structlog
+
+import structlog_gcp
+from structlog_gcp.writers import BufferedPrintLoggerFactory
+
+
+def thread_counts(maximum: int) -> list[int]:
+    counts = []
+    count = 1
+    while count < maximum:
+        counts.append(count)
+        count *= 2
+    counts.append(maximum)
+    return counts
+
+
+def run(threads: int, count: int, logger: Any) -> float:
+    barrier = threading.Barrier(threads + 1)
+
+    def work() -> None:
+        barrier.wait()
+        for i in range(count):
+            logger.info("benchmark entry", iteration=i)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    return threads * count / elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--count", type=int, default=20_000)
+    args = parser.parse_args()
+
+    is_gil_enabled: Callable[[], bool] = getattr(sys, "_is_gil_enabled", lambda: True)
+    print(
+        f"Python {sys.version.split()[0]}, "
+        f"GIL {'enabled' if is_gil_enabled() else 'disabled'}, "
+        f"{os.cpu_count()} CPUs"
+    )
+
+    with open(os.devnull, "w") as devnull:
+        buffered = BufferedPrintLoggerFactory(devnull)
+        writers: dict[str, Callable[..., Any]] = {
+            "PrintLogger": structlog.PrintLoggerFactory(devnull),
+            "BufferedPrintLogger": buffered,
+        }
+
+        print(f"{'threads':>8}" + "".join(f"{name:>22}" for name in writers))
+
+        for threads in thread_counts(args.threads):
+            results = []
+            for factory in writers.values():
+                structlog.configure(
+                    processors=structlog_gcp.build_processors(),
+                    logger_factory=factory,
+                    cache_logger_on_first_use=True,
+                )
+                logger = structlog.get_logger()
+                results.append(run(threads, args.count, logger))
+
+            line = "".join(f"{result:>17,.0f} ev/s" for result in results)
+            print(f"{threads:>8}{line}")
+
+        buffered.logger.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
-from .base import build_gcp_processors, build_processors  # noqa: F401
+from .base import (  # noqa: F401
+    build_fanout_processors,
+    build_gcp_processors,
+    build_processors,
+)
 
 __all__ = [
+    "build_fanout_processors",
     "build_gcp_processors",
     "build_processors",
 ]
@@ -2,12 +2,15 @@ import structlog.contextvars
 import structlog.processors
 from structlog.typing import Processor
 
-from . import error_reporting, processors
+from . import error_reporting, processors, profiling
+from .sinks import FanOut, Sink
 
 
 def build_processors(
     service: str | None = None,
     version: str | None = None,
+    error_report_interval: float | None = None,
+    profile: bool | profiling.Profiler = False,
 ) -> list[Processor]:
     """Build structlog processors to export logs for Google Cloud Logging.
 
@@ -23,7 +26,7 @@ def build_processors(
     procs: list[Processor] = []
 
     procs.append(structlog.contextvars.merge_contextvars)
-    procs.extend(build_gcp_processors(service, version))
+    procs.extend(build_gcp_processors(service, version, error_report_interval, profile))
     procs.append(structlog.processors.JSONRenderer())
 
     return procs
@@ -32,6 +35,8 @@ def build_processors(
 def build_gcp_processors(
     service: str | None = None,
     version: str | None = None,
+    error_report_interval: float | None = None,
+    profile: bool | profiling.Profiler = False,
 ) -> list[Processor]:
     """Build only the Google Cloud Logging-specific processors.
 
@@ -46,6 +51,36 @@ def build_gcp_processors(
     expected to provide your own.
 
     For a simpler, more general alternative, use :ref:`build_processors` instead.
+
+    If ``error_report_interval`` is set, errors of the same group are reported to Error Reporting
+    at most once per interval (in seconds), see :ref:`.error_reporting.ErrorGroups`.
+
+    If ``profile`` is set, each processor is wrapped to measure its duration, using either the
+    given :ref:`.profiling.Profiler` or :ref:`.profiling.default_profiler`. Otherwise, the
+    processors are returned as-is and don't have any overhead.
+    """
+
+    procs = _build_gcp_shared_processors(service, version, error_report_interval)
+
+    # Finally: Cloud Logging formatter
+    procs.append(processors.finalize_cloud_logging)
+
+    if profile is True:
+        profile = profiling.default_profiler
+    if profile:
+        procs = profile.wrap(procs)
+
+    return procs
+
+
+def _build_gcp_shared_processors(
+    service: str | None,
+    version: str | None,
+    error_report_interval: float | None,
+) -> list[Processor]:
+    """Build the Google Cloud Logging-specific processors, except the finalizer.
+
+    They prepare the Google Cloud Logging event, which can then be rendered in different ways.
     """
 
     procs: list[Processor] = []
@@ -63,10 +98,36 @@ def build_gcp_processors(
     # Errors: formatter for Error Reporting
     procs.append(error_reporting.ReportError(["CRITICAL"]))
 
+    # Errors: don't flood Error Reporting with errors of the same group
+    if error_report_interval is not None:
+        procs.append(error_reporting.ErrorGroups(error_report_interval))
+
     # Errors: add service context
     procs.append(error_reporting.ServiceContext(service, version))
 
-    # Finally: Cloud Logging formatter
-    procs.append(processors.finalize_cloud_logging)
+    return procs
+
+
+def build_fanout_processors(
+    sinks: list[Sink],
+    service: str | None = None,
+    version: str | None = None,
+    error_report_interval: float | None = None,
+) -> list[Processor]:
+    """Build structlog processors sending each log event to several sinks.
+
+    The processors common to all the sinks (context variables, timestamp, code location, severity,
+    exceptions and Error Reporting) run only once per log event. Each sink then runs its own
+    processors, typically built with :ref:`.sinks.build_gcp_tail` or
+    :ref:`.sinks.build_console_tail`, and writes the result to its own logger.
+
+    The logger configured in structlog itself is never called.
+    """
+
+    procs: list[Processor] = []
+
+    procs.append(structlog.contextvars.merge_contextvars)
+    procs.extend(_build_gcp_shared_processors(service, version, error_report_interval))
+    procs.append(FanOut(sinks))
 
     return procs
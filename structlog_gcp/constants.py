@@ -6,6 +6,9 @@ SOURCE_LOCATION_KEY = "logging.googleapis.com/sourceLocation"
 
 CLOUD_LOGGING_KEY = "cloud-logging"
 
+# Reference to the Error Reporting group of an error, see ErrorGroups.
+ERROR_GROUP_KEY = "errorGroup"
+
 # From Python's logging level to Google level
 # https://cloud.google.com/logging/docs/reference/v2/rest/v2/LogEntry#LogSeverity
 SEVERITY_MAPPING = {
@@ -21,3 +24,17 @@ SEVERITY_MAPPING = {
     # "alert": "ALERT", # A person must take an action immediately.
     # "emergency": "EMERGENCY", #	One or more systems are unusable.
 }
+
+# Numeric value of Google's log severities, to compare them.
+# https://cloud.google.com/logging/docs/reference/v2/rest/v2/LogEntry#LogSeverity
+SEVERITY_LEVELS = {
+    "DEFAULT": 0,
+    "DEBUG": 100,
+    "INFO": 200,
+    "NOTICE": 300,
+    "WARNING": 400,
+    "ERROR": 500,
+    "CRITICAL": 600,
+    "ALERT": 700,
+    "EMERGENCY": 800,
+}
@@ -1,9 +1,31 @@
+import hashlib
 import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
 
 import structlog.processors
 from structlog.typing import EventDict, Processor, WrappedLogger
 
-from .constants import CLOUD_LOGGING_KEY, ERROR_EVENT_TYPE, SOURCE_LOCATION_KEY
+from .constants import (
+    CLOUD_LOGGING_KEY,
+    ERROR_EVENT_TYPE,
+    ERROR_GROUP_KEY,
+    SOURCE_LOCATION_KEY,
+)
+
+# A frame of a formatted Python traceback
+_FRAME_RE = re.compile(
+    r'^\s*File "(?P<file>[^"]+)", line \d+, in (?P<function>.+)$', re.M
+)
+
+# The exception type at the start of the last line of a formatted exception
+_EXCEPTION_TYPE_RE = re.compile(r"^[\w.]+")
+
+# The margin of the lines of a formatted exception group and its sub-exceptions
+_EXCEPTION_GROUP_MARGIN_RE = re.compile(r"^ *\| ?", re.M)
 
 
 def setup_exceptions() -> list[Processor]:
@@ -44,7 +66,8 @@ class ReportError:
     # https://cloud.google.com/error-reporting/docs/formatting-error-messages#log-entry-examples
 
     def __init__(self, severities: list[str]) -> None:
-        self.severities = severities
+        # Immutable, as it's shared by all the threads which are logging.
+        self.severities = frozenset(severities)
 
     def __call__(
         self, logger: WrappedLogger, method_name: str, event_dict: EventDict
@@ -69,6 +92,142 @@ class ReportError:
         return event_dict
 
 
+def _exception_type(stack_trace: str, frames: list[re.Match[str]]) -> str:
+    """Find the type of the exception in a formatted exception.
+
+    The type is on the first line after the last frame, which is followed by
+    indented source code lines. The exception message and notes which come
+    after can span several lines, and are ignored.
+    """
+
+    start = frames[-1].end() if frames else 0
+    for line in stack_trace[start:].splitlines():
+        if line and not line[0].isspace():
+            match = _EXCEPTION_TYPE_RE.match(line)
+            return match.group() if match else line
+
+    return ""
+
+
+def error_group_key(event: dict[str, Any], frames: int = 3) -> str:
+    """Compute a stable key identifying the group of an error.
+
+    ``event`` is the Google Cloud Logging part of the event dict, as set up by
+    :class:`ReportError`.
+
+    The key is derived from the exception type and the ``frames`` innermost
+    frames of the stack trace, if any. Line numbers are ignored, so the key
+    doesn't change when unrelated code moves around. Without stack frames, the
+    location which reported the error is used instead.
+
+    For exception groups, the type and frames of the last sub-exception with a
+    stack trace are used.
+    """
+
+    parts: list[str] = []
+
+    stack_trace = event.get("stack_trace")
+    if stack_trace is not None:
+        stack_trace = str(stack_trace).strip()
+        if "Exception Group Traceback" in stack_trace:
+            stack_trace = _EXCEPTION_GROUP_MARGIN_RE.sub("", stack_trace)
+        found_frames = list(_FRAME_RE.finditer(stack_trace))
+
+        parts.append(_exception_type(stack_trace, found_frames))
+
+        for frame in found_frames[-frames:]:
+            parts.append(f"{frame['file']}:{frame['function']}")
+
+    if len(parts) < 2:
+        location = event.get("context", {}).get("reportLocation")
+        if location is None:
+            location = event.get(SOURCE_LOCATION_KEY, {})
+        parts.append(
+            f"{location.get('file')}:{location.get('line')}:{location.get('function')}"
+        )
+
+    digest = hashlib.blake2b("\n".join(parts).encode(), digest_size=8)
+    return digest.hexdigest()
+
+
+class _ErrorGroup:
+    __slots__ = ("count", "first_seen", "last_seen", "last_reported")
+
+    def __init__(self, now: float) -> None:
+        self.count = 0
+        self.first_seen = now
+        self.last_seen = now
+        self.last_reported: float | None = None
+
+
+class ErrorGroups:
+    """Limit how often errors of the same group are reported to Error Reporting.
+
+    This class assumes the :ref:`ReportError` processor ran before.
+
+    Errors are grouped using :func:`error_group_key`. The first error of a group
+    is reported to Error Reporting as usual, and then at most once every
+    ``interval`` seconds. The other errors of the group are logged as plain log
+    entries, without their stack trace, so Error Reporting doesn't pick them
+    up.
+
+    All the errors get a reference to their group and the number of times the
+    group has been seen so far.
+
+    Only the ``max_groups`` most recently seen groups are remembered.
+    """
+
+    def __init__(
+        self, interval: float = 60.0, max_groups: int = 1024, frames: int = 3
+    ) -> None:
+        self.interval = interval
+        self.max_groups = max_groups
+        self.frames = frames
+
+        self.groups: OrderedDict[str, _ErrorGroup] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __call__(
+        self, logger: WrappedLogger, method_name: str, event_dict: EventDict
+    ) -> EventDict:
+        event = event_dict[CLOUD_LOGGING_KEY]
+        if event.get("@type") != ERROR_EVENT_TYPE:
+            return event_dict
+
+        key = error_group_key(event, self.frames)
+        now = time.monotonic()
+
+        with self._lock:
+            group = self.groups.get(key)
+            if group is None:
+                group = self.groups[key] = _ErrorGroup(now)
+                if len(self.groups) > self.max_groups:
+                    self.groups.popitem(last=False)
+            else:
+                self.groups.move_to_end(key)
+
+            group.count += 1
+            group.last_seen = now
+
+            report = (
+                group.last_reported is None
+                or now - group.last_reported >= self.interval
+            )
+            if report:
+                group.last_reported = now
+
+            count = group.count
+
+        event[ERROR_GROUP_KEY] = {"id": key, "count": count}
+
+        if not report:
+            del event["@type"]
+            event.pop("context", None)
+            event.pop("stack_trace", None)
+
+        return event_dict
+
+
 class ServiceContext:
     def __init__(self, service: str | None = None, version: str | None = None) -> None:
         # https://cloud.google.com/functions/docs/configuring/env-var#runtime_environment_variables_set_automatically
@@ -93,6 +252,8 @@ class ServiceContext:
             return event_dict
 
         # https://cloud.google.com/error-reporting/reference/rest/v1beta1/ServiceContext
-        event_dict[CLOUD_LOGGING_KEY]["serviceContext"] = self.service_context
+        # Give each event its own copy, so the events never share mutable state
+        # across threads.
+        event_dict[CLOUD_LOGGING_KEY]["serviceContext"] = dict(self.service_context)
 
         return event_dict
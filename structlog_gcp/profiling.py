@@ -0,0 +1,237 @@
+"""Measure how long each Google Cloud Logging processor takes.
+
+Enable it with ``build_processors(profile=True)``: each processor built by
+:ref:`.base.build_gcp_processors` is then wrapped to measure its duration.
+Timings are accumulated per thread, without any lock on the logging path, and
+aggregated when read.
+
+>>> from structlog_gcp import profiling
+>>> profiler = profiling.Profiler()
+>>> processors = profiler.wrap([lambda logger, method_name, event_dict: event_dict])
+>>> processors[0](None, "info", {"event": "test"})
+{'event': 'test'}
+>>> [(stat.name, stat.calls) for stat in profiler.stats()]
+[('<lambda>', 1)]
+
+The timings can then be printed with :meth:`Profiler.print_table`, or written
+with :meth:`Profiler.dump_pstats` (for :mod:`pstats`, snakeviz, ...) or
+:meth:`Profiler.dump_speedscope` (for https://www.speedscope.app/).
+"""
+
+import array
+import json
+import marshal
+import sys
+import threading
+from time import perf_counter_ns
+from typing import Any, NamedTuple, TextIO
+
+from structlog.typing import EventDict, Processor, WrappedLogger
+
+
+class ProcessorStats(NamedTuple):
+    name: str
+    file: str
+    line: int
+    calls: int
+    total_ns: int
+
+
+def _describe(processor: Processor) -> tuple[str, str, int]:
+    """Return the name, file and line number of a processor."""
+
+    code = getattr(processor, "__code__", None)
+    if code is not None:
+        name = getattr(processor, "__qualname__", code.co_name)
+    else:
+        # Instances of classes implementing __call__
+        cls = type(processor)
+        code = getattr(cls.__call__, "__code__", None)
+        name = cls.__qualname__
+
+    if code is None:
+        return name, "~", 0
+
+    return name, code.co_filename, code.co_firstlineno
+
+
+class _Timer:
+    """Per-thread durations and number of calls of a processor."""
+
+    def __init__(self, name: str, file: str, line: int) -> None:
+        self.name, self.file, self.line = name, file, line
+
+        self.local = threading.local()
+        # One array per live thread: total duration (ns), number of calls.
+        self.counters: list[tuple[threading.Thread, array.array[int]]] = []
+        # Sum of the counters of the threads which are gone.
+        self.finished = array.array("q", [0, 0])
+        self.lock = threading.Lock()
+
+    def _fold_finished(self) -> None:
+        """Merge the counters of the threads which are gone, with the lock held."""
+
+        alive = []
+        for thread, counters in self.counters:
+            if thread.is_alive():
+                alive.append((thread, counters))
+            else:
+                self.finished[0] += counters[0]
+                self.finished[1] += counters[1]
+        self.counters = alive
+
+    def thread_counters(self) -> "array.array[int]":
+        counters = array.array("q", [0, 0])
+        self.local.counters = counters
+        with self.lock:
+            # Don't keep the counters of each thread ever started.
+            self._fold_finished()
+            self.counters.append((threading.current_thread(), counters))
+        return counters
+
+    def stats(self) -> ProcessorStats:
+        with self.lock:
+            self._fold_finished()
+            all_counters = [self.finished] + [c for _, c in self.counters]
+
+        total_ns = sum(counters[0] for counters in all_counters)
+        calls = sum(counters[1] for counters in all_counters)
+        return ProcessorStats(self.name, self.file, self.line, calls, total_ns)
+
+    def reset(self) -> None:
+        with self.lock:
+            self.finished[0] = self.finished[1] = 0
+            for _, counters in self.counters:
+                counters[0] = counters[1] = 0
+
+
+class Profiler:
+    """Accumulate the time spent in each of the processors it wraps.
+
+    Processors with the same name and location share their timings, for
+    instance when the processors are built several times.
+    """
+
+    def __init__(self) -> None:
+        # Indexed by name, file and line number.
+        self.timers: dict[tuple[str, str, int], _Timer] = {}
+        self._lock = threading.Lock()
+
+    def _wrap(self, processor: Processor) -> Processor:
+        key = _describe(processor)
+        with self._lock:
+            timer = self.timers.get(key)
+            if timer is None:
+                timer = self.timers[key] = _Timer(*key)
+
+        local = timer.local
+        thread_counters = timer.thread_counters
+
+        def profiled(
+            logger: WrappedLogger, method_name: str, event_dict: EventDict
+        ) -> Any:
+            start = perf_counter_ns()
+            try:
+                return processor(logger, method_name, event_dict)
+            finally:
+                elapsed = perf_counter_ns() - start
+                try:
+                    counters = local.counters
+                except AttributeError:
+                    counters = thread_counters()
+                counters[0] += elapsed
+                counters[1] += 1
+
+        profiled.__wrapped__ = processor  # type: ignore[attr-defined]
+        return profiled
+
+    def wrap(self, processors: list[Processor]) -> list[Processor]:
+        """Wrap processors to measure their duration."""
+
+        return [self._wrap(processor) for processor in processors]
+
+    def stats(self) -> list[ProcessorStats]:
+        """Return the timings of each processor, aggregated over all the threads."""
+
+        with self._lock:
+            timers = list(self.timers.values())
+
+        return [timer.stats() for timer in timers]
+
+    def reset(self) -> None:
+        """Reset all the timings."""
+
+        with self._lock:
+            timers = list(self.timers.values())
+
+        for timer in timers:
+            timer.reset()
+
+    def print_table(self, file: TextIO | None = None) -> None:
+        """Print the timings as a table, slowest processors first."""
+
+        file = file or sys.stdout
+        stats = sorted(self.stats(), key=lambda stat: stat.total_ns, reverse=True)
+        grand_total = sum(stat.total_ns for stat in stats) or 1
+
+        print(
+            f"{'processor':<40} {'calls':>10} {'total ms':>12} "
+            f"{'per call ns':>12} {'%':>6}",
+            file=file,
+        )
+        for stat in stats:
+            per_call = stat.total_ns // stat.calls if stat.calls else 0
+            print(
+                f"{stat.name:<40} {stat.calls:>10} {stat.total_ns / 1e6:>12.3f} "
+                f"{per_call:>12} {100 * stat.total_ns / grand_total:>6.1f}",
+                file=file,
+            )
+
+    def dump_pstats(self, path: str) -> None:
+        """Write the timings in a file which can be loaded by :class:`pstats.Stats`."""
+
+        # Same format as cProfile.Profile.dump_stats(): for each function,
+        # (primitive calls, calls, total time, cumulative time, callers).
+        pstats: dict[tuple[str, int, str], Any] = {}
+        for stat in self.stats():
+            seconds = stat.total_ns / 1e9
+            key = (stat.file, stat.line, stat.name)
+            pstats[key] = (stat.calls, stat.calls, seconds, seconds, {})
+
+        with open(path, "wb") as fp:
+            marshal.dump(pstats, fp)
+
+    def dump_speedscope(self, path: str) -> None:
+        """Write the timings in a file which can be loaded by speedscope."""
+
+        stats = self.stats()
+        weights = [stat.total_ns for stat in stats]
+
+        profile = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": "structlog-gcp processors",
+            "shared": {
+                "frames": [
+                    {"name": stat.name, "file": stat.file, "line": stat.line}
+                    for stat in stats
+                ],
+            },
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": "structlog-gcp processors",
+                    "unit": "nanoseconds",
+                    "startValue": 0,
+                    "endValue": sum(weights),
+                    "samples": [[index] for index in range(len(stats))],
+                    "weights": weights,
+                },
+            ],
+        }
+
+        with open(path, "w") as fp:
+            json.dump(profile, fp)
+
+
+# The profiler used by ``build_processors(profile=True)``.
+default_profiler = Profiler()
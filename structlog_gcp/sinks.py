@@ -0,0 +1,134 @@
+"""Send each log event to several sinks.
+
+A sink has its own processors and its own logger. For instance, log events can
+be written as JSON on the standard output for Google Cloud Logging, and in a
+human-readable format into a local file.
+
+See :ref:`.base.build_fanout_processors`.
+"""
+
+import sys
+import traceback
+from typing import Any
+
+import structlog
+import structlog.dev
+import structlog.processors
+from structlog.typing import EventDict, Processor, WrappedLogger
+
+from .constants import CLOUD_LOGGING_KEY, SEVERITY_LEVELS
+from .processors import finalize_cloud_logging
+
+
+def build_gcp_tail() -> list[Processor]:
+    """Build the processors of a sink formatting log events for Google Cloud Logging."""
+
+    return [finalize_cloud_logging, structlog.processors.JSONRenderer()]
+
+
+def build_console_tail(colors: bool = False) -> list[Processor]:
+    """Build the processors of a sink formatting log events for humans."""
+
+    return [console_event, structlog.dev.ConsoleRenderer(colors=colors)]
+
+
+def console_event(
+    logger: WrappedLogger, method_name: str, event_dict: EventDict
+) -> EventDict:
+    """Turn the Google Cloud Logging event back into a regular structlog event.
+
+    The result can be rendered using :class:`structlog.dev.ConsoleRenderer`.
+    """
+
+    gcp_event = event_dict.pop(CLOUD_LOGGING_KEY)
+
+    event_dict["timestamp"] = gcp_event["time"]
+    event_dict["level"] = gcp_event["severity"].lower()
+    event_dict["event"] = gcp_event["message"]
+
+    if "stack_trace" in gcp_event:
+        event_dict["exception"] = gcp_event["stack_trace"]
+
+    return event_dict
+
+
+class Sink:
+    """A destination for log events, with its own processors and logger.
+
+    Only the log events with at least the ``min_severity`` Google Cloud Logging
+    severity are sent to the sink.
+
+    By default, the logger writes to the standard output.
+    """
+
+    def __init__(
+        self,
+        processors: list[Processor],
+        logger: WrappedLogger | None = None,
+        min_severity: str = "DEFAULT",
+    ) -> None:
+        self.processors = processors
+        self.logger = logger if logger is not None else structlog.PrintLogger()
+        self.min_level = SEVERITY_LEVELS[min_severity]
+
+
+class FanOut:
+    """Run the processors of each sink, and write the result to its logger.
+
+    This must be the last processor: the log event is then dropped, so the
+    logger configured in structlog isn't called.
+
+    Each sink gets its own copy of the event dict and of its Google Cloud
+    Logging event, except the last one which gets the originals. Other nested
+    values are shared between the sinks and must not be modified in place by
+    their processors.
+
+    If a sink fails, the error is printed on the standard error, like
+    :mod:`logging` handlers do, and the other sinks still get the log event.
+    """
+
+    def __init__(self, sinks: list[Sink]) -> None:
+        self.sinks = sinks
+
+    def __call__(
+        self, logger: WrappedLogger, method_name: str, event_dict: EventDict
+    ) -> EventDict:
+        severity = event_dict[CLOUD_LOGGING_KEY]["severity"]
+        level = SEVERITY_LEVELS.get(severity, 0)
+
+        sinks = [sink for sink in self.sinks if level >= sink.min_level]
+        last = len(sinks) - 1
+
+        for i, sink in enumerate(sinks):
+            if i == last:
+                event = event_dict
+            else:
+                event = dict(event_dict)
+                event[CLOUD_LOGGING_KEY] = dict(event_dict[CLOUD_LOGGING_KEY])
+
+            try:
+                self._emit(sink, method_name, event)
+            except Exception:
+                traceback.print_exc(file=sys.stderr)
+
+        raise structlog.DropEvent
+
+    def _emit(self, sink: Sink, method_name: str, event_dict: EventDict) -> None:
+        result: Any = event_dict
+        try:
+            for proc in sink.processors:
+                result = proc(sink.logger, method_name, result)
+        except structlog.DropEvent:
+            return
+
+        # Same conventions as structlog's bound loggers.
+        args: tuple[Any, ...]
+        kwargs: dict[str, Any]
+        if isinstance(result, (str, bytes, bytearray)):
+            args, kwargs = (result,), {}
+        elif isinstance(result, tuple):
+            args, kwargs = result
+        else:
+            args, kwargs = (), result
+
+        getattr(sink.logger, method_name)(*args, **kwargs)
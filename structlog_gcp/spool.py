@@ -0,0 +1,446 @@
+"""Crash-safe local spool for Google Cloud Logging entries.
+
+When the logging agent is down or the standard output is back-pressured, log
+entries can be written to a local spool instead, and replayed later as JSON
+lines.
+
+A spool is a directory of append-only segment files. Each segment is
+memory-mapped and starts with a small header, followed by length-prefixed
+records::
+
+    +--------+------------+-----------+-----------+---------+------------+-----
+    | header | length (4) | CRC32 (4) | flags (1) | payload | length (4) | ...
+    +--------+------------+-----------+-----------+---------+------------+-----
+
+The payload is the rendered log entry, optionally compressed with ``zlib``, and
+the CRC32 is computed over the payload as stored. Unused space at the end of a
+segment is zero-filled, and a record with no flags marks the end of the
+segment.
+
+Use :class:`SpoolLoggerFactory` to make structlog write to the standard output,
+and into a spool when that fails, and :func:`drain` on restart to send the
+spooled entries back to the standard output.
+"""
+
+import fcntl
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import weakref
+import zlib
+from collections.abc import Iterator
+from typing import Any, Literal, TextIO
+
+SEGMENT_HEADER = b"SGCPSPL1"
+SEGMENT_SUFFIX = ".spool"
+SEGMENT_NAME_RE = re.compile(r"^\d{12}\.spool$")
+
+# Payload length, CRC32 of the payload (unsigned 32 bits, little-endian) and
+# record flags.
+RECORD_HEADER = struct.Struct("<IIB")
+
+FLAG_RAW = 0x01
+FLAG_ZLIB = 0x02
+
+FsyncPolicy = Literal["never", "batch", "interval"]
+
+
+def list_segments(directory: str) -> list[str]:
+    """Return the path of all the segments of a spool, oldest first."""
+
+    try:
+        names = os.listdir(directory)
+    except FileNotFoundError:
+        return []
+
+    names = sorted(name for name in names if SEGMENT_NAME_RE.match(name))
+    return [os.path.join(directory, name) for name in names]
+
+
+def read_segment(path: str) -> Iterator[str]:
+    """Read the log entries stored in a segment file.
+
+    Reading stops at the first incomplete or corrupted record, which can
+    happen if the process or the host crashed while writing it: the records
+    after it can't be located reliably anymore.
+    """
+
+    with open(path, "rb") as fp:
+        data = fp.read()
+
+    if not data.startswith(SEGMENT_HEADER):
+        raise ValueError(f"Not a spool segment: {path}")
+
+    offset = len(SEGMENT_HEADER)
+    while offset + RECORD_HEADER.size <= len(data):
+        length, crc, flags = RECORD_HEADER.unpack_from(data, offset)
+        if flags == 0:
+            break
+
+        offset += RECORD_HEADER.size
+        payload = data[offset : offset + length]
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            break
+
+        offset += length
+        try:
+            if flags & FLAG_ZLIB:
+                payload = zlib.decompress(payload)
+            line = payload.decode("utf-8")
+        except (zlib.error, UnicodeDecodeError):
+            break
+
+        yield line
+
+
+def _lock_segment(path: str) -> int | None:
+    """Open and lock a segment, unless a writer is still using it.
+
+    Returns the file descriptor holding the lock, or ``None``.
+    """
+
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return None
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+
+    return fd
+
+
+def drain(directory: str, output: TextIO) -> int:
+    """Write all the spooled log entries to ``output`` as JSON lines.
+
+    Segments are removed once they have been completely written to ``output``.
+    Corrupted records end their segment, and invalid segments are removed
+    without being written: the other segments are still drained.
+
+    Segments which are still being written by a :class:`SpoolWriter`, in this
+    process or in another one, are skipped.
+
+    Returns the number of log entries written.
+    """
+
+    count = 0
+
+    for path in list_segments(directory):
+        fd = _lock_segment(path)
+        if fd is None:
+            continue
+
+        try:
+            try:
+                for line in read_segment(path):
+                    output.write(line)
+                    output.write("\n")
+                    count += 1
+            except ValueError:
+                # Not a segment, or its header never reached the disk.
+                pass
+
+            output.flush()
+            os.remove(path)
+        finally:
+            os.close(fd)
+
+    return count
+
+
+# Writers to reopen in the child processes, see SpoolWriter._after_fork().
+_writers: "weakref.WeakSet[SpoolWriter]" = weakref.WeakSet()
+
+
+def _after_fork() -> None:
+    for writer in list(_writers):
+        writer._after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+class SpoolWriter:
+    """Append log entries to memory-mapped segment files.
+
+    Entries are copied into the page cache as soon as they are written, so they
+    survive a crash of the process. The ``fsync`` policy controls how often
+    they are flushed to the disk, to also survive a crash of the host:
+
+    * ``never``: let the operating system decide;
+    * ``batch``: after every ``fsync_batch`` entries;
+    * ``interval``: every ``fsync_interval`` seconds, from a background
+      thread, if entries have been written since the last flush.
+
+    A new segment is started when the current one is full. Only the last
+    ``max_segments`` segments are kept, older segments are removed.
+
+    Several processes can write into the same directory: each one writes into
+    its own segments, locked while they are being written. A process forked
+    from a writing process starts its own segment on its first write.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        segment_size: int = 16 * 1024 * 1024,
+        max_segments: int = 8,
+        compress: bool = False,
+        fsync: FsyncPolicy = "interval",
+        fsync_batch: int = 128,
+        fsync_interval: float = 1.0,
+    ) -> None:
+        if segment_size <= len(SEGMENT_HEADER) + RECORD_HEADER.size:
+            raise ValueError(f"Segment size is too small: {segment_size}")
+
+        if max_segments < 1:
+            raise ValueError(f"At least one segment must be kept: {max_segments}")
+
+        if fsync not in ("never", "batch", "interval"):
+            raise ValueError(f"Unknown fsync policy: {fsync!r}")
+
+        if fsync == "interval" and fsync_interval <= 0:
+            raise ValueError(f"Invalid fsync interval: {fsync_interval}")
+
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.compress = compress
+        self.fsync = fsync
+        self.fsync_batch = fsync_batch
+        self.fsync_interval = fsync_interval
+
+        os.makedirs(directory, exist_ok=True)
+
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._forked = False
+        self._open_segment(segment_size)
+
+        self._syncer: threading.Thread | None = None
+        self._stopped = threading.Event()
+        self._start_syncer()
+
+        _writers.add(self)
+
+    def _start_syncer(self) -> None:
+        if self.fsync == "interval":
+            self._syncer = threading.Thread(
+                target=self._run_syncer,
+                name="structlog-gcp-spool-syncer",
+                daemon=True,
+            )
+            self._syncer.start()
+
+    def _run_syncer(self) -> None:
+        while not self._stopped.wait(self.fsync_interval):
+            with self._lock:
+                if self._unsynced and not self._mmap.closed:
+                    self._sync()
+
+    def _next_sequence(self) -> int:
+        segments = list_segments(self.directory)
+        if not segments:
+            return self._sequence
+
+        last = os.path.basename(segments[-1])
+        return max(self._sequence, int(last.removesuffix(SEGMENT_SUFFIX)) + 1)
+
+    def _open_segment(self, size: int) -> None:
+        while True:
+            self._sequence = self._next_sequence()
+            self._path = os.path.join(
+                self.directory, f"{self._sequence:012d}{SEGMENT_SUFFIX}"
+            )
+            self._sequence += 1
+
+            try:
+                # Never take over the segment of another process.
+                fp = open(self._path, "x+b")
+            except FileExistsError:
+                continue
+
+            fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+            if os.fstat(fp.fileno()).st_nlink:
+                break
+
+            # Removed by drain() before it could be locked.
+            fp.close()
+
+        self._fp = fp
+        fp.truncate(size)
+        self._mmap = mmap.mmap(fp.fileno(), size)
+
+        self._mmap[: len(SEGMENT_HEADER)] = SEGMENT_HEADER
+        self._offset = len(SEGMENT_HEADER)
+
+    def _close_segment(self) -> None:
+        self._mmap.flush()
+        self._mmap.close()
+
+        # Give back the unused, zero-filled space, and release the lock.
+        self._fp.truncate(self._offset)
+        self._fp.close()
+
+    def _rotate(self, size: int) -> None:
+        self._close_segment()
+        self._open_segment(size)
+
+        for path in list_segments(self.directory)[: -self.max_segments]:
+            # Segments of the other processes are still being written.
+            fd = _lock_segment(path)
+            if fd is not None:
+                os.remove(path)
+                os.close(fd)
+
+    def _after_fork(self) -> None:
+        # The parent process keeps writing into the current segment: only
+        # release it in this process, and start a new one on the next write.
+        self._lock = threading.Lock()
+        self._mmap.close()
+        self._fp.close()
+        self._forked = True
+
+        # Threads don't survive a fork.
+        self._syncer = None
+        self._stopped = threading.Event()
+
+    def write(self, message: str | bytes) -> None:
+        """Append a rendered log entry to the spool."""
+
+        payload = message.encode("utf-8") if isinstance(message, str) else message
+        flags = FLAG_RAW
+        if self.compress:
+            payload = zlib.compress(payload)
+            flags = FLAG_ZLIB
+
+        length = len(payload)
+        record_size = RECORD_HEADER.size + length
+
+        with self._lock:
+            if self._forked:
+                self._forked = False
+                self._open_segment(self.segment_size)
+                self._start_syncer()
+
+            end = self._offset + record_size
+            if end > len(self._mmap):
+                # Entries larger than a segment get their own segment.
+                needed = len(SEGMENT_HEADER) + record_size
+                self._rotate(max(self.segment_size, needed))
+                end = self._offset + record_size
+
+            # Write the payload before its header: a reader never sees a
+            # header pointing to a partially written payload.
+            start = self._offset + RECORD_HEADER.size
+            self._mmap[start:end] = payload
+            crc = zlib.crc32(payload)
+            RECORD_HEADER.pack_into(self._mmap, self._offset, length, crc, flags)
+            self._offset = end
+
+            self._unsynced += 1
+            if self.fsync == "batch" and self._unsynced >= self.fsync_batch:
+                self._sync()
+
+    def _sync(self) -> None:
+        self._mmap.flush()
+        self._unsynced = 0
+
+    def sync(self) -> None:
+        """Flush the current segment to the disk."""
+
+        with self._lock:
+            if not self._mmap.closed:
+                self._sync()
+
+    def close(self) -> None:
+        """Stop the background thread, flush and close the current segment."""
+
+        self._stopped.set()
+        if self._syncer is not None:
+            self._syncer.join()
+
+        with self._lock:
+            if not self._mmap.closed:
+                self._close_segment()
+
+    def __enter__(self) -> "SpoolWriter":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class SpoolLogger:
+    """A structlog logger writing to a file, or into a spool when that fails.
+
+    Log entries are written to the file descriptor of ``file`` (the standard
+    output by default). If writing fails, for instance because the reading end
+    of the pipe is gone or because a non-blocking standard output is full, the
+    entry is written into the spool instead, to be sent again with
+    :func:`drain` on restart.
+
+    If only part of an entry could be written, the whole entry is spooled, and
+    the partial line is terminated before the next entry is written: it shows
+    up as a truncated, unparsable line, but doesn't corrupt the next entry.
+    """
+
+    def __init__(self, writer: SpoolWriter, file: TextIO | None = None) -> None:
+        self._writer = writer
+        # Resolve the standard output when writing, in case it gets replaced.
+        self._file = file
+        self._lock = threading.Lock()
+        # Whether an entry has been partially written, leaving its line
+        # unterminated.
+        self._partial = False
+
+    def msg(self, message: str | bytes) -> None:
+        data = message.encode("utf-8") if isinstance(message, str) else message
+        data += b"\n"
+        file = self._file or sys.stdout
+
+        with self._lock:
+            # Terminate the partial line first.
+            closing = b"\n" if self._partial else b""
+            data = closing + data
+
+            written = 0
+            try:
+                # Write what other code left in the buffers of the file first.
+                file.flush()
+                fd = file.fileno()
+                # Write to the file descriptor directly, to know how much of
+                # the entry has been written if that fails.
+                while written < len(data):
+                    written += os.write(fd, data[written:])
+            except OSError:
+                # Unless exactly the closing newline has been written, a line
+                # is still left unterminated.
+                self._partial = written != len(closing)
+                self._writer.write(message)
+            else:
+                self._partial = False
+
+    log = debug = info = warn = warning = msg
+    fatal = failure = err = error = critical = exception = msg
+
+
+class SpoolLoggerFactory:
+    """Create a :class:`SpoolLogger` shared by all the loggers.
+
+    To be used as structlog's ``logger_factory``.
+    """
+
+    def __init__(self, writer: SpoolWriter, file: TextIO | None = None) -> None:
+        self.logger = SpoolLogger(writer, file)
+
+    def __call__(self, *args: Any) -> SpoolLogger:
+        return self.logger
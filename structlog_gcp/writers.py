@@ -0,0 +1,180 @@
+"""Loggers writing the rendered log entries to a file.
+
+structlog's :class:`structlog.PrintLogger` takes a lock shared by all the
+threads and flushes the file for every single log entry. With many threads,
+or on a free-threaded Python build, this lock serializes all the threads
+which are logging.
+
+:class:`BufferedPrintLogger` instead collects the log entries in a buffer per
+thread, and only takes the shared lock to write a whole batch of entries at
+once.
+"""
+
+import atexit
+import sys
+import threading
+import time
+from typing import Any, TextIO
+
+
+class _ThreadBuffer:
+    __slots__ = ("lock", "lines", "since", "thread")
+
+    def __init__(self) -> None:
+        # Only contended while flushing all the buffers. Held while writing
+        # the lines taken from the buffer, so that they are written in order:
+        # always acquired before the write lock.
+        self.lock = threading.Lock()
+        self.lines: list[str] = []
+        self.since = 0.0
+        self.thread = threading.current_thread()
+
+
+class BufferedPrintLogger:
+    """Print log entries into a file, buffered per thread.
+
+    The entries of a thread are written when ``max_entries`` entries are
+    buffered, when the oldest buffered entry is older than ``max_delay``
+    seconds, or immediately for error and critical entries. A background
+    thread enforces ``max_delay`` for the threads which stopped logging.
+
+    Call :meth:`flush` to write all the buffered entries; this is also done
+    automatically when the interpreter exits normally. The interpreter doesn't
+    exit normally on ``SIGTERM`` unless it's handled, for instance by calling
+    :func:`sys.exit` from a signal handler: otherwise, up to ``max_delay``
+    seconds of log entries are lost.
+
+    Entries of a given thread are written in order, but entries of different
+    threads can be written out of order, by up to ``max_delay`` seconds.
+    """
+
+    def __init__(
+        self,
+        file: TextIO | None = None,
+        max_entries: int = 64,
+        max_delay: float = 1.0,
+    ) -> None:
+        # Resolve the standard output when writing, in case it gets replaced.
+        self._file = file
+        self.max_entries = max_entries
+        self.max_delay = max_delay
+
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._buffers: list[_ThreadBuffer] = []
+        self._buffers_lock = threading.Lock()
+
+        # Started with the first buffer.
+        self._flusher: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+        atexit.register(self.close)
+
+    def _buffer(self) -> _ThreadBuffer:
+        try:
+            buffer: _ThreadBuffer = self._local.buffer
+        except AttributeError:
+            buffer = self._local.buffer = _ThreadBuffer()
+            with self._buffers_lock:
+                self._buffers.append(buffer)
+
+                if self._flusher is None and self.max_delay > 0:
+                    self._flusher = threading.Thread(
+                        target=self._run_flusher,
+                        name="structlog-gcp-flusher",
+                        daemon=True,
+                    )
+                    self._flusher.start()
+
+        return buffer
+
+    def _write(self, lines: list[str]) -> None:
+        file = self._file or sys.stdout
+        data = "\n".join(lines) + "\n"
+
+        with self._write_lock:
+            file.write(data)
+            file.flush()
+
+    def _append(self, message: str, force: bool) -> None:
+        buffer = self._buffer()
+        now = time.monotonic()
+
+        with buffer.lock:
+            if not buffer.lines:
+                buffer.since = now
+            buffer.lines.append(message)
+
+            if (
+                not force
+                and len(buffer.lines) < self.max_entries
+                and now - buffer.since < self.max_delay
+            ):
+                return
+
+            lines, buffer.lines = buffer.lines, []
+            self._write(lines)
+
+    def msg(self, message: str) -> None:
+        self._append(message, force=False)
+
+    def msg_and_flush(self, message: str) -> None:
+        self._append(message, force=True)
+
+    log = debug = info = warn = warning = msg
+    fatal = failure = err = error = critical = exception = msg_and_flush
+
+    def _run_flusher(self) -> None:
+        # Waking up every half delay to write the entries older than half the
+        # delay keeps all the entries within the delay.
+        interval = self.max_delay / 2
+        while not self._stopped.wait(interval):
+            self._flush(interval)
+
+    def _flush(self, min_age: float) -> None:
+        with self._buffers_lock:
+            buffers = list(self._buffers)
+
+        now = time.monotonic()
+        for buffer in buffers:
+            with buffer.lock:
+                if not buffer.lines or now - buffer.since < min_age:
+                    continue
+                lines, buffer.lines = buffer.lines, []
+                self._write(lines)
+
+        # Forget about the threads which are gone, once their entries are written.
+        with self._buffers_lock:
+            self._buffers = [b for b in self._buffers if b.thread.is_alive() or b.lines]
+
+    def flush(self) -> None:
+        """Write the entries buffered by all the threads."""
+
+        self._flush(0)
+
+    def close(self) -> None:
+        """Stop the background thread and write all the buffered entries."""
+
+        atexit.unregister(self.close)
+        self._stopped.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self.flush()
+
+
+class BufferedPrintLoggerFactory:
+    """Create a :class:`BufferedPrintLogger` shared by all the loggers.
+
+    To be used as structlog's ``logger_factory``.
+    """
+
+    def __init__(
+        self,
+        file: TextIO | None = None,
+        max_entries: int = 64,
+        max_delay: float = 1.0,
+    ) -> None:
+        self.logger = BufferedPrintLogger(file, max_entries, max_delay)
+
+    def __call__(self, *args: Any) -> BufferedPrintLogger:
+        return self.logger
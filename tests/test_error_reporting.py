@@ -0,0 +1,221 @@
+import traceback
+from typing import Any
+from unittest.mock import patch
+
+import structlog
+
+import structlog_gcp
+from structlog_gcp.error_reporting import ErrorGroups, error_group_key
+
+from .conftest import T_stdout
+
+LOCATION = {"file": "/app/test.py", "line": "42", "function": "test:test123"}
+
+
+def fail(exc: Exception) -> None:
+    raise exc
+
+
+def format_exception(exc: Exception) -> str:
+    try:
+        fail(exc)
+    except Exception as raised:
+        return "".join(traceback.format_exception(raised))
+    raise AssertionError("not raised")  # pragma: no cover
+
+
+def error_event(**kwargs: Any) -> dict[str, Any]:
+    return {
+        "@type": "type.googleapis.com/google.devtools.clouderrorreporting.v1beta1.ReportedErrorEvent",
+        "context": {"reportLocation": LOCATION},
+        "logging.googleapis.com/sourceLocation": LOCATION,
+        **kwargs,
+    }
+
+
+def test_group_key_ignores_exception_message() -> None:
+    key1 = error_group_key({"stack_trace": format_exception(ValueError("one"))})
+    key2 = error_group_key({"stack_trace": format_exception(ValueError("two"))})
+    key3 = error_group_key({"stack_trace": format_exception(TypeError("one"))})
+
+    assert key1 == key2
+    assert key1 != key3
+
+
+def test_group_key_multiline_message() -> None:
+    key1 = error_group_key(
+        {"stack_trace": format_exception(ValueError("failed:\n{'id': 1}"))}
+    )
+    key2 = error_group_key(
+        {"stack_trace": format_exception(ValueError("failed:\n{'id': 2}"))}
+    )
+    key3 = error_group_key(
+        {"stack_trace": format_exception(TypeError("failed:\n{'id': 1}"))}
+    )
+
+    assert key1 == key2
+    assert key1 != key3
+
+
+def test_group_key_notes() -> None:
+    def with_note(exc: Exception, note: str) -> Exception:
+        exc.__notes__ = [note]
+        return exc
+
+    key1 = error_group_key(
+        {"stack_trace": format_exception(with_note(ValueError("a"), "Retry later"))}
+    )
+    key2 = error_group_key(
+        {"stack_trace": format_exception(with_note(TypeError("b"), "Retry later"))}
+    )
+    key3 = error_group_key(
+        {"stack_trace": format_exception(with_note(ValueError("c"), "Retry now"))}
+    )
+
+    assert key1 != key2
+    assert key1 == key3
+
+
+def test_group_key_chained_exception() -> None:
+    def chained(exc: Exception) -> Exception:
+        try:
+            raise KeyError("cause")
+        except KeyError as cause:
+            exc.__cause__ = cause
+        return exc
+
+    # The type is the one of the last exception, not of its cause.
+    key1 = error_group_key({"stack_trace": format_exception(chained(ValueError()))})
+    key2 = error_group_key({"stack_trace": format_exception(chained(TypeError()))})
+
+    assert key1 != key2
+
+
+def exception_group(exception: str, message: str) -> str:
+    # Exception groups require Python 3.11.
+    return f"""\
+  + Exception Group Traceback (most recent call last):
+  |   File "/app/main.py", line 10, in handler
+  |     raise ExceptionGroup("failed", errors)
+  | ExceptionGroup: failed (1 sub-exception)
+  +-+---------------- 1 ----------------
+    | Traceback (most recent call last):
+    |   File "/app/main.py", line 5, in work
+    |     raise {exception}({message!r})
+    | {exception}: {message}
+    +------------------------------------
+"""
+
+
+def test_group_key_exception_group() -> None:
+    key1 = error_group_key(error_event(stack_trace=exception_group("ValueError", "a")))
+    key2 = error_group_key(error_event(stack_trace=exception_group("ValueError", "b")))
+    key3 = error_group_key(error_event(stack_trace=exception_group("TypeError", "a")))
+
+    assert key1 == key2
+    assert key1 != key3
+
+    # The frames are found, the report location isn't used.
+    other_location = {**LOCATION, "line": "43"}
+    key4 = error_group_key(
+        error_event(
+            stack_trace=exception_group("ValueError", "a"),
+            context={"reportLocation": other_location},
+        )
+    )
+    assert key1 == key4
+
+
+def test_group_key_without_frames() -> None:
+    # Without frames, the location where the error was reported is used.
+    key1 = error_group_key(error_event(stack_trace="ValueError('one')"))
+    key2 = error_group_key(error_event(stack_trace="ValueError: two\nlines"))
+    key3 = error_group_key(error_event(stack_trace="TypeError('one')"))
+
+    assert key1 == key2
+    assert key1 != key3
+
+
+def test_group_key_report_location() -> None:
+    event = error_event()
+    other_location = {**LOCATION, "line": "43"}
+
+    assert error_group_key(event) == error_group_key(dict(event))
+    assert error_group_key(event) != error_group_key(
+        {"logging.googleapis.com/sourceLocation": other_location}
+    )
+
+
+def test_groups_interval() -> None:
+    groups = ErrorGroups(interval=60)
+
+    def report(now: float) -> dict[str, Any]:
+        event_dict = {"cloud-logging": error_event(stack_trace="ValueError('oops')")}
+        with patch("time.monotonic", return_value=now):
+            event: dict[str, Any] = groups(None, "error", event_dict)["cloud-logging"]
+        return event
+
+    first = report(0)
+    assert "@type" in first
+    assert first["stack_trace"] == "ValueError('oops')"
+    assert first["errorGroup"]["count"] == 1
+
+    second = report(30)
+    assert "@type" not in second
+    assert "context" not in second
+    assert "stack_trace" not in second
+    assert second["errorGroup"] == {"id": first["errorGroup"]["id"], "count": 2}
+
+    third = report(60)
+    assert "@type" in third
+    assert third["errorGroup"]["count"] == 3
+
+
+def test_groups_bounded() -> None:
+    groups = ErrorGroups(max_groups=2)
+
+    for line in ["1", "2", "1", "3"]:
+        location = {**LOCATION, "line": line}
+        event = error_event(context={"reportLocation": location})
+        groups(None, "critical", {"cloud-logging": event})
+
+    assert len(groups.groups) == 2
+    assert [group.count for group in groups.groups.values()] == [2, 1]
+
+
+def test_groups_ignore_other_events() -> None:
+    groups = ErrorGroups()
+    event_dict = {"cloud-logging": {"severity": "INFO"}}
+
+    assert groups(None, "info", event_dict) == {"cloud-logging": {"severity": "INFO"}}
+    assert len(groups.groups) == 0
+
+
+def test_build_processors(stdout: T_stdout, mock_logger_env: None) -> None:
+    processors = structlog_gcp.build_processors(error_report_interval=60)
+    structlog.configure(processors=processors)
+    logger = structlog.get_logger()
+
+    for _ in range(2):
+        try:
+            1 / 0
+        except ZeroDivisionError:
+            logger.exception("oh noes")
+
+    first = next(stdout)
+    second = next(stdout)
+
+    assert first["@type"].endswith("ReportedErrorEvent")
+    assert "serviceContext" in first
+    assert first["errorGroup"]["count"] == 1
+
+    expected = {
+        "errorGroup": {"id": first["errorGroup"]["id"], "count": 2},
+        "logging.googleapis.com/sourceLocation": LOCATION,
+        "message": "oh noes",
+        "severity": "ERROR",
+        "time": "2023-04-01T08:00:00.000000Z",
+    }
+    assert second == expected
+
+    structlog.reset_defaults()
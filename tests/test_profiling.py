@@ -0,0 +1,138 @@
+import io
+import json
+import pstats
+import threading
+from pathlib import Path
+
+import structlog
+
+import structlog_gcp
+from structlog_gcp import profiling
+
+from .conftest import T_stdout
+
+
+def test_disabled_by_default(mock_logger_env: None) -> None:
+    for processor in structlog_gcp.build_gcp_processors():
+        assert not hasattr(processor, "__wrapped__")
+
+
+def test_default_profiler(mock_logger_env: None) -> None:
+    processors = structlog_gcp.build_gcp_processors(profile=True)
+
+    assert all(hasattr(processor, "__wrapped__") for processor in processors)
+    names = [timer.name for timer in profiling.default_profiler.timers.values()]
+    assert "finalize_cloud_logging" in names
+
+
+def test_build_twice(mock_logger_env: None) -> None:
+    profiler = profiling.Profiler()
+
+    first = structlog_gcp.build_processors(profile=profiler)
+    second = structlog_gcp.build_processors(profile=profiler)
+
+    structlog.configure(processors=first)
+    structlog.get_logger().info("test")
+    structlog.configure(processors=second)
+    structlog.get_logger().info("test")
+
+    stats = profiler.stats()
+    assert len(stats) == len(structlog_gcp.build_gcp_processors())
+    assert all(stat.calls == 2 for stat in stats)
+
+    structlog.reset_defaults()
+
+
+def test_profile(stdout: T_stdout, mock_logger_env: None) -> None:
+    profiler = profiling.Profiler()
+    processors = structlog_gcp.build_processors(profile=profiler)
+    structlog.configure(processors=processors)
+    logger = structlog.get_logger()
+
+    logger.info("test")
+
+    # The output isn't changed.
+    msg = next(stdout)
+    assert msg["message"] == "test"
+    assert msg["severity"] == "INFO"
+
+    def work() -> None:
+        for _ in range(3):
+            logger.info("test")
+
+    threads = [threading.Thread(target=work) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = {stat.name: stat for stat in profiler.stats()}
+
+    # Only the GCP processors are profiled.
+    assert len(stats) == len(structlog_gcp.build_gcp_processors())
+    assert "merge_contextvars" not in stats
+    assert "JSONRenderer" not in stats
+
+    assert stats["LogSeverity"].calls == 7
+    assert stats["LogSeverity"].file.endswith("processors.py")
+    assert stats["init_cloud_logging"].calls == 7
+    assert stats["finalize_cloud_logging"].total_ns > 0
+
+    profiler.reset()
+    assert all(stat.calls == 0 for stat in profiler.stats())
+
+    structlog.reset_defaults()
+
+
+def test_finished_threads() -> None:
+    profiler = profiling.Profiler()
+    (processor,) = profiler.wrap(structlog_gcp.build_gcp_processors()[:1])
+
+    for _ in range(10):
+        thread = threading.Thread(target=processor, args=(None, "info", {}))
+        thread.start()
+        thread.join()
+
+    (timer,) = profiler.timers.values()
+    (stat,) = profiler.stats()
+
+    # The counters of the finished threads are merged.
+    assert stat.calls == 10
+    assert timer.counters == []
+
+
+def profiled() -> profiling.Profiler:
+    profiler = profiling.Profiler()
+    for processor in profiler.wrap(structlog_gcp.build_gcp_processors()[:1]):
+        processor(None, "info", {})
+
+    return profiler
+
+
+def test_print_table() -> None:
+    output = io.StringIO()
+    profiled().print_table(output)
+
+    header, line = output.getvalue().splitlines()
+    assert header.split()[:2] == ["processor", "calls"]
+    assert line.split()[:2] == ["TimeStamper", "1"]
+
+
+def test_dump_pstats(tmp_path: Path) -> None:
+    path = str(tmp_path / "profile.pstats")
+    profiled().dump_pstats(path)
+
+    stats = pstats.Stats(path)
+    ((file, line, name),) = stats.stats.keys()  # type: ignore[attr-defined]
+    assert name == "TimeStamper"
+    assert file.endswith("processors.py")
+
+
+def test_dump_speedscope(tmp_path: Path) -> None:
+    path = tmp_path / "profile.speedscope.json"
+    profiled().dump_speedscope(str(path))
+
+    profile = json.loads(path.read_text())
+    assert profile["shared"]["frames"][0]["name"] == "TimeStamper"
+    assert profile["profiles"][0]["samples"] == [[0]]
+    assert profile["profiles"][0]["weights"][0] >= 0
@@ -0,0 +1,202 @@
+import io
+import json
+from typing import Any
+
+import structlog
+from _pytest.capture import CaptureFixture
+from structlog.typing import EventDict, WrappedLogger
+
+import structlog_gcp
+from structlog_gcp.sinks import Sink, build_console_tail, build_gcp_tail
+
+
+def configure(*sinks: Sink) -> Any:
+    processors = structlog_gcp.build_fanout_processors(list(sinks))
+    structlog.configure(processors=processors)
+    return structlog.get_logger()
+
+
+def test_fanout(capsys: CaptureFixture[str], mock_logger_env: None) -> None:
+    gcp_output = io.StringIO()
+    console_output = io.StringIO()
+
+    logger = configure(
+        Sink(build_gcp_tail(), structlog.PrintLogger(gcp_output)),
+        Sink(build_console_tail(), structlog.PrintLogger(console_output)),
+    )
+    logger.info("test", foo="bar")
+
+    # The logger configured in structlog isn't used.
+    assert capsys.readouterr().out == ""
+
+    msg = json.loads(gcp_output.getvalue())
+    expected = {
+        "logging.googleapis.com/sourceLocation": {
+            "file": "/app/test.py",
+            "function": "test:test123",
+            "line": "42",
+        },
+        "foo": "bar",
+        "message": "test",
+        "severity": "INFO",
+        "time": "2023-04-01T08:00:00.000000Z",
+    }
+    assert msg == expected
+
+    console = console_output.getvalue()
+    assert console.startswith("2023-04-01T08:00:00.000000Z [info     ] test")
+    assert "foo=bar" in console
+
+    structlog.reset_defaults()
+
+
+def test_fanout_exception(mock_logger_env: None) -> None:
+    gcp_output = io.StringIO()
+    console_output = io.StringIO()
+
+    logger = configure(
+        Sink(build_gcp_tail(), structlog.PrintLogger(gcp_output)),
+        Sink(build_console_tail(), structlog.PrintLogger(console_output)),
+    )
+
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("oh noes")
+
+    msg = json.loads(gcp_output.getvalue())
+    assert msg["severity"] == "ERROR"
+    assert msg["stack_trace"].endswith("ZeroDivisionError: division by zero")
+    assert "serviceContext" in msg
+
+    assert (
+        console_output.getvalue()
+        .rstrip()
+        .endswith("ZeroDivisionError: division by zero")
+    )
+
+    structlog.reset_defaults()
+
+
+def test_fanout_min_severity(mock_logger_env: None) -> None:
+    all_output = io.StringIO()
+    warnings_output = io.StringIO()
+
+    logger = configure(
+        Sink(build_gcp_tail(), structlog.PrintLogger(all_output)),
+        Sink(
+            build_gcp_tail(),
+            structlog.PrintLogger(warnings_output),
+            min_severity="WARNING",
+        ),
+    )
+    logger.info("info")
+    logger.warning("warning")
+
+    all_messages = [json.loads(line) for line in all_output.getvalue().splitlines()]
+    assert [msg["message"] for msg in all_messages] == ["info", "warning"]
+
+    warning_messages = warnings_output.getvalue().splitlines()
+    assert [json.loads(line)["message"] for line in warning_messages] == ["warning"]
+
+    structlog.reset_defaults()
+
+
+def test_fanout_sinks_are_isolated(mock_logger_env: None) -> None:
+    outputs = [io.StringIO(), io.StringIO()]
+
+    def drop(
+        logger: WrappedLogger, method_name: str, event_dict: EventDict
+    ) -> EventDict:
+        raise structlog.DropEvent
+
+    def add_key(
+        logger: WrappedLogger, method_name: str, event_dict: EventDict
+    ) -> EventDict:
+        event_dict["added"] = True
+        return event_dict
+
+    logger = configure(
+        Sink([add_key, *build_gcp_tail()], structlog.PrintLogger(outputs[0])),
+        Sink([drop], structlog.PrintLogger(io.StringIO())),
+        Sink(build_gcp_tail(), structlog.PrintLogger(outputs[1])),
+    )
+    logger.info("test")
+
+    first, second = (json.loads(output.getvalue()) for output in outputs)
+    assert first["added"] is True
+    assert "added" not in second
+
+    structlog.reset_defaults()
+
+
+def test_fanout_nested_copy(mock_logger_env: None) -> None:
+    outputs = [io.StringIO(), io.StringIO()]
+
+    def add_labels(
+        logger: WrappedLogger, method_name: str, event_dict: EventDict
+    ) -> EventDict:
+        event_dict["cloud-logging"]["logging.googleapis.com/labels"] = {"a": "b"}
+        return event_dict
+
+    logger = configure(
+        Sink([add_labels, *build_gcp_tail()], structlog.PrintLogger(outputs[0])),
+        Sink(build_gcp_tail(), structlog.PrintLogger(outputs[1])),
+    )
+    logger.info("test")
+
+    first, second = (json.loads(output.getvalue()) for output in outputs)
+    assert first["logging.googleapis.com/labels"] == {"a": "b"}
+    assert "logging.googleapis.com/labels" not in second
+
+    structlog.reset_defaults()
+
+
+def test_fanout_failing_sink(
+    capsys: CaptureFixture[str], mock_logger_env: None
+) -> None:
+    output = io.StringIO()
+
+    def fail(
+        logger: WrappedLogger, method_name: str, event_dict: EventDict
+    ) -> EventDict:
+        raise RuntimeError("broken sink")
+
+    logger = configure(
+        Sink([fail]),
+        Sink(build_gcp_tail(), structlog.PrintLogger(output)),
+    )
+    logger.info("test")
+
+    assert json.loads(output.getvalue())["message"] == "test"
+    assert "RuntimeError: broken sink" in capsys.readouterr().err
+
+    structlog.reset_defaults()
+
+
+def test_fanout_logger_conventions(mock_logger_env: None) -> None:
+    calls = []
+
+    class Logger:
+        def info(self, *args: Any, **kwargs: Any) -> None:
+            calls.append((args, kwargs))
+
+    def render_tuple(
+        logger: WrappedLogger, method_name: str, event_dict: EventDict
+    ) -> Any:
+        return ("tuple",), {"key": "value"}
+
+    def render_dict(
+        logger: WrappedLogger, method_name: str, event_dict: EventDict
+    ) -> Any:
+        return {"key": "value"}
+
+    logger = configure(
+        Sink([render_tuple], Logger()),
+        Sink([render_dict], Logger()),
+    )
+    logger.info("test")
+
+    assert calls == [(("tuple",), {"key": "value"}), ((), {"key": "value"})]
+
+    structlog.reset_defaults()
@@ -0,0 +1,345 @@
+import io
+import json
+import os
+import threading
+from pathlib import Path
+from typing import TextIO
+
+import pytest
+import structlog
+from _pytest.capture import CaptureFixture
+
+import structlog_gcp
+from structlog_gcp import spool
+
+
+@pytest.mark.parametrize("compress", [False, True], ids=["raw", "zlib"])
+def test_write_and_drain(tmp_path: Path, compress: bool) -> None:
+    with spool.SpoolWriter(str(tmp_path), compress=compress) as writer:
+        writer.write('{"message": "one"}')
+        writer.write(b'{"message": "two"}')
+
+    output = io.StringIO()
+    count = spool.drain(str(tmp_path), output)
+
+    assert count == 2
+    assert output.getvalue() == '{"message": "one"}\n{"message": "two"}\n'
+    assert spool.list_segments(str(tmp_path)) == []
+
+
+def test_read_without_close(tmp_path: Path) -> None:
+    # Simulate a crash: the segment is never closed nor flushed explicitly.
+    writer = spool.SpoolWriter(str(tmp_path), fsync="never")
+    writer.write("one")
+    writer.write("two")
+
+    (segment,) = spool.list_segments(str(tmp_path))
+    assert list(spool.read_segment(segment)) == ["one", "two"]
+
+    writer.close()
+
+
+def test_read_partial_record(tmp_path: Path) -> None:
+    with spool.SpoolWriter(str(tmp_path)) as writer:
+        writer.write("one")
+        writer.write("two")
+
+    (segment,) = spool.list_segments(str(tmp_path))
+    os.truncate(segment, os.path.getsize(segment) - 1)
+
+    assert list(spool.read_segment(segment)) == ["one"]
+
+
+def test_read_invalid_segment(tmp_path: Path) -> None:
+    segment = tmp_path / "000000000000.spool"
+    segment.write_bytes(b"garbage")
+
+    with pytest.raises(ValueError):
+        list(spool.read_segment(str(segment)))
+
+
+def test_rotation(tmp_path: Path) -> None:
+    with spool.SpoolWriter(str(tmp_path), segment_size=64, max_segments=3) as writer:
+        for i in range(20):
+            writer.write(f"message {i:02d}")
+
+    segments = spool.list_segments(str(tmp_path))
+    assert len(segments) == 3
+    assert all(os.path.getsize(segment) <= 64 for segment in segments)
+
+    output = io.StringIO()
+    spool.drain(str(tmp_path), output)
+
+    lines = output.getvalue().splitlines()
+    assert lines == [f"message {i:02d}" for i in range(20 - len(lines), 20)]
+
+
+def test_oversized_entry(tmp_path: Path) -> None:
+    message = "x" * 100
+
+    with spool.SpoolWriter(str(tmp_path), segment_size=64) as writer:
+        writer.write("small")
+        writer.write(message)
+        writer.write("small again")
+
+    output = io.StringIO()
+    spool.drain(str(tmp_path), output)
+
+    assert output.getvalue().splitlines() == ["small", message, "small again"]
+
+
+def test_resume_sequence(tmp_path: Path) -> None:
+    with spool.SpoolWriter(str(tmp_path)) as writer:
+        writer.write("first run")
+
+    with spool.SpoolWriter(str(tmp_path)) as writer:
+        writer.write("second run")
+
+    assert len(spool.list_segments(str(tmp_path))) == 2
+
+    output = io.StringIO()
+    spool.drain(str(tmp_path), output)
+
+    assert output.getvalue().splitlines() == ["first run", "second run"]
+
+
+def test_concurrent_writers(tmp_path: Path) -> None:
+    # Like two processes writing into the same directory.
+    first = spool.SpoolWriter(str(tmp_path), segment_size=64)
+    second = spool.SpoolWriter(str(tmp_path), segment_size=64)
+
+    for i in range(4):
+        first.write(f"first {i}")
+        second.write(f"second {i}")
+
+    # The segments being written are left alone.
+    output = io.StringIO()
+    spool.drain(str(tmp_path), output)
+    first.close()
+    second.close()
+    spool.drain(str(tmp_path), output)
+
+    expected = [f"{name} {i}" for name in ("first", "second") for i in range(4)]
+    assert sorted(output.getvalue().splitlines()) == expected
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork()")
+def test_fork(tmp_path: Path) -> None:
+    writer = spool.SpoolWriter(str(tmp_path))
+    writer.write("before fork")
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            writer.write("child")
+            writer.close()
+        finally:
+            os._exit(0)
+
+    os.waitpid(pid, 0)
+    writer.write("parent")
+    writer.close()
+
+    output = io.StringIO()
+    spool.drain(str(tmp_path), output)
+
+    assert output.getvalue().splitlines() == ["before fork", "parent", "child"]
+
+
+@pytest.mark.parametrize("fsync", ["never", "batch", "interval"])
+def test_fsync_policies(tmp_path: Path, fsync: spool.FsyncPolicy) -> None:
+    with spool.SpoolWriter(
+        str(tmp_path), fsync=fsync, fsync_batch=2, fsync_interval=0.01
+    ) as writer:
+        for i in range(5):
+            writer.write(f"message {i}")
+        writer.sync()
+
+    output = io.StringIO()
+    assert spool.drain(str(tmp_path), output) == 5
+
+
+def test_fsync_interval(tmp_path: Path) -> None:
+    with spool.SpoolWriter(str(tmp_path), fsync_interval=0.01) as writer:
+        synced = threading.Event()
+        original = writer._sync
+
+        def sync() -> None:
+            original()
+            synced.set()
+
+        writer._sync = sync  # type: ignore[method-assign]
+        writer.write("one")
+
+        # Flushed by the background thread, without any other write.
+        assert synced.wait(10)
+
+
+def test_invalid_configuration(tmp_path: Path) -> None:
+    with pytest.raises(ValueError):
+        spool.SpoolWriter(str(tmp_path), segment_size=8)
+
+    with pytest.raises(ValueError):
+        spool.SpoolWriter(str(tmp_path), max_segments=0)
+
+    with pytest.raises(ValueError):
+        spool.SpoolWriter(str(tmp_path), fsync="always")  # type: ignore[arg-type]
+
+    with pytest.raises(ValueError):
+        spool.SpoolWriter(str(tmp_path), fsync="interval", fsync_interval=0)
+
+
+def test_corrupted_record(tmp_path: Path) -> None:
+    first = tmp_path / "first"
+    with spool.SpoolWriter(str(first), compress=True) as writer:
+        writer.write("one")
+        writer.write("two")
+        writer.write("three")
+
+    second = tmp_path / "second"
+    with spool.SpoolWriter(str(second)) as writer:
+        writer.write("four")
+
+    # Flip the first byte of the second record's payload.
+    (segment,) = spool.list_segments(str(first))
+    data = bytearray(Path(segment).read_bytes())
+    offset = len(spool.SEGMENT_HEADER)
+    length, _, _ = spool.RECORD_HEADER.unpack_from(data, offset)
+    offset += spool.RECORD_HEADER.size + length + spool.RECORD_HEADER.size
+    data[offset] ^= 0xFF
+    Path(segment).write_bytes(bytes(data))
+
+    assert list(spool.read_segment(segment)) == ["one"]
+
+    # The segments are in the same directory, the corrupted one first.
+    os.rename(
+        spool.list_segments(str(second))[0], tmp_path / "first" / "000000000001.spool"
+    )
+
+    output = io.StringIO()
+    assert spool.drain(str(first), output) == 2
+    assert output.getvalue().splitlines() == ["one", "four"]
+    assert spool.list_segments(str(first)) == []
+
+
+def test_drain_invalid_segment(tmp_path: Path) -> None:
+    (tmp_path / "000000000000.spool").write_bytes(b"\0" * 64)
+
+    with spool.SpoolWriter(str(tmp_path)) as writer:
+        writer.write("one")
+
+    output = io.StringIO()
+    assert spool.drain(str(tmp_path), output) == 1
+    assert output.getvalue() == "one\n"
+    assert spool.list_segments(str(tmp_path)) == []
+
+
+def test_ignore_other_files(tmp_path: Path) -> None:
+    (tmp_path / "backup.spool").write_bytes(b"garbage")
+
+    with spool.SpoolWriter(str(tmp_path)) as writer:
+        writer.write("one")
+
+    assert spool.list_segments(str(tmp_path)) == [str(tmp_path / "000000000000.spool")]
+
+
+def broken_pipe() -> TextIO:
+    read_fd, write_fd = os.pipe()
+    os.close(read_fd)
+    return os.fdopen(write_fd, "w")
+
+
+def read_available(fd: int) -> bytes:
+    os.set_blocking(fd, False)
+    chunks = []
+    while True:
+        try:
+            chunk = os.read(fd, 65536)
+        except BlockingIOError:
+            break
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def test_logger_writes_to_file(tmp_path: Path) -> None:
+    path = tmp_path / "output.log"
+
+    with spool.SpoolWriter(str(tmp_path / "spool")) as writer:
+        with path.open("w") as output:
+            logger = spool.SpoolLogger(writer, output)
+            logger.info("one")
+            logger.error(b"two")
+
+    assert path.read_text() == "one\ntwo\n"
+    assert spool.drain(str(tmp_path / "spool"), io.StringIO()) == 0
+
+
+def test_logger_spools_on_failure(tmp_path: Path) -> None:
+    with spool.SpoolWriter(str(tmp_path)) as writer, broken_pipe() as pipe:
+        logger = spool.SpoolLogger(writer, pipe)
+        logger.info("one")
+        logger.error("two")
+
+    output = io.StringIO()
+    spool.drain(str(tmp_path), output)
+
+    assert output.getvalue() == "one\ntwo\n"
+
+
+def test_logger_partial_write(tmp_path: Path) -> None:
+    read_fd, write_fd = os.pipe()
+    os.set_blocking(write_fd, False)
+
+    # Larger than PIPE_BUF, so they can be partially written to a full pipe.
+    entries = [f"{i}{'x' * 10000}" for i in range(20)]
+
+    with spool.SpoolWriter(str(tmp_path)) as writer, os.fdopen(write_fd, "w") as pipe:
+        logger = spool.SpoolLogger(writer, pipe)
+        for entry in entries:
+            logger.info(entry)
+
+        written = read_available(read_fd).split(b"\n")
+        logger.info("last")
+        written += read_available(read_fd).split(b"\n")
+        os.close(read_fd)
+
+    spooled = io.StringIO()
+    spool.drain(str(tmp_path), spooled)
+
+    # The partially written entry is terminated before the next one.
+    lines = [line.decode() for line in written if line]
+    *complete, truncated, last = lines
+    assert last == "last"
+    assert truncated not in entries
+    assert any(entry.startswith(truncated) for entry in entries)
+
+    # All the other entries are either written or spooled.
+    assert sorted(complete + spooled.getvalue().splitlines()) == sorted(entries)
+
+
+def test_logger_factory(
+    tmp_path: Path, capsys: CaptureFixture[str], mock_logger_env: None
+) -> None:
+    writer = spool.SpoolWriter(str(tmp_path))
+    factory = spool.SpoolLoggerFactory(writer, broken_pipe())
+
+    structlog.configure(
+        processors=structlog_gcp.build_processors(),
+        logger_factory=factory,
+    )
+    logger = structlog.get_logger()
+    logger.info("spooled", foo="bar")
+    writer.close()
+
+    output = capsys.readouterr()
+    assert "" == output.out
+
+    drained = io.StringIO()
+    spool.drain(str(tmp_path), drained)
+
+    msg = json.loads(drained.getvalue())
+    assert msg["message"] == "spooled"
+    assert msg["severity"] == "INFO"
+    assert msg["foo"] == "bar"
+
+    structlog.reset_defaults()
@@ -0,0 +1,190 @@
+import io
+import json
+import threading
+import time
+
+import structlog
+from _pytest.capture import CaptureFixture
+
+import structlog_gcp
+from structlog_gcp.writers import BufferedPrintLogger, BufferedPrintLoggerFactory
+
+
+def test_buffered_max_entries() -> None:
+    output = io.StringIO()
+    logger = BufferedPrintLogger(output, max_entries=3)
+
+    logger.info("one")
+    logger.info("two")
+    assert output.getvalue() == ""
+
+    logger.info("three")
+    assert output.getvalue() == "one\ntwo\nthree\n"
+
+    logger.close()
+
+
+def test_buffered_max_delay() -> None:
+    output = io.StringIO()
+    logger = BufferedPrintLogger(output, max_delay=0)
+
+    logger.info("one")
+    assert output.getvalue() == "one\n"
+
+    logger.close()
+
+
+def test_buffered_errors_are_written_immediately() -> None:
+    output = io.StringIO()
+    logger = BufferedPrintLogger(output)
+
+    logger.info("one")
+    logger.error("two")
+    assert output.getvalue() == "one\ntwo\n"
+
+    logger.close()
+
+
+def test_buffered_flush_all_threads() -> None:
+    output = io.StringIO()
+    logger = BufferedPrintLogger(output, max_delay=60)
+
+    def work(name: str) -> None:
+        for i in range(3):
+            logger.info(f"{name}-{i}")
+
+    threads = [threading.Thread(target=work, args=(str(n),)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    logger.info("main")
+    assert output.getvalue() == ""
+
+    logger.flush()
+    lines = output.getvalue().splitlines()
+    assert sorted(lines) == sorted(
+        ["main"] + [f"{n}-{i}" for n in range(4) for i in range(3)]
+    )
+
+    # Each thread's entries are kept in order.
+    for n in range(4):
+        assert [line for line in lines if line.startswith(f"{n}-")] == [
+            f"{n}-{i}" for i in range(3)
+        ]
+
+    # The buffers of the finished threads are gone.
+    output.seek(0)
+    output.truncate()
+    logger.flush()
+    assert output.getvalue() == ""
+
+    logger.close()
+
+
+def test_buffered_flush_keeps_order() -> None:
+    output = io.StringIO()
+    logger = BufferedPrintLogger(output, max_delay=60)
+    logged = threading.Event()
+    flushing = threading.Event()
+
+    def work() -> None:
+        logger.info("one")
+        logged.set()
+        flushing.wait()
+        logger.error("two")
+
+    thread = threading.Thread(target=work)
+    flusher = threading.Thread(target=logger.flush)
+
+    # Another thread is writing while "one" gets flushed.
+    with logger._write_lock:
+        thread.start()
+        logged.wait()
+        flusher.start()
+
+        try:
+            # The buffer stays locked until "one" is written, so "two" can't
+            # be written before.
+            (buffer,) = logger._buffers
+            deadline = time.monotonic() + 10
+            while not buffer.lock.locked():
+                assert time.monotonic() < deadline
+                time.sleep(0.001)
+        finally:
+            flushing.set()
+
+    flusher.join()
+    thread.join()
+    logger.close()
+
+    assert output.getvalue() == "one\ntwo\n"
+
+
+def test_buffered_idle_thread() -> None:
+    output = io.StringIO()
+    logger = BufferedPrintLogger(output, max_delay=60)
+
+    # The thread logs once, and then stays idle.
+    logged = threading.Event()
+    idle = threading.Event()
+
+    def work() -> None:
+        logger.info("one")
+        logged.set()
+        idle.wait()
+
+    thread = threading.Thread(target=work)
+    thread.start()
+    logged.wait()
+
+    # What the background thread does: only the old enough entries are written.
+    logger._flush(30)
+    assert output.getvalue() == ""
+
+    logger._flush(0)
+    assert output.getvalue() == "one\n"
+
+    idle.set()
+    thread.join()
+    logger.close()
+
+
+def test_buffered_background_thread() -> None:
+    output = io.StringIO()
+    logger = BufferedPrintLogger(output, max_delay=0.01)
+
+    logger.info("one")
+
+    # Written without any other log entry.
+    deadline = time.monotonic() + 10
+    while output.getvalue() == "" and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    assert output.getvalue() == "one\n"
+
+    logger.close()
+
+
+def test_factory(capsys: CaptureFixture[str], mock_logger_env: None) -> None:
+    factory = BufferedPrintLoggerFactory(max_delay=60)
+    structlog.configure(
+        processors=structlog_gcp.build_processors(),
+        logger_factory=factory,
+    )
+    logger = structlog.get_logger()
+
+    logger.info("one")
+    logger.warning("two")
+    assert capsys.readouterr().out == ""
+
+    factory.logger.flush()
+    output = capsys.readouterr()
+    assert "" == output.err
+
+    messages = [json.loads(line)["message"] for line in output.out.splitlines()]
+    assert messages == ["one", "two"]
+
+    factory.logger.close()
+    structlog.reset_defaults()